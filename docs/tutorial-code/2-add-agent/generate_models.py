@@ -1,8 +1,15 @@
 import shutil
 from pathlib import Path
 
-import pandas as pd
-from muse.wizard import add_agent, get_sectors
+from muse.wizard import (
+    CsvBatch,
+    CsvEdit,
+    ScenarioPatch,
+    apply_patch,
+    copy_scenario,
+    get_sectors,
+    set_column_constant,
+)
 
 parent_path = Path(__file__).parent
 
@@ -15,35 +22,32 @@ def generate_model_1():
     """
     model_name = "1-single-objective"
     model_path = parent_path / model_name
-    if model_path.exists():
-        shutil.rmtree(model_path)
 
     # Starting point: copy model from previous tutorial
-    shutil.copytree(parent_path / "../1-add-new-technology/2-scenario", model_path)
+    copy_scenario(
+        parent_path / "../1-add-new-technology/2-scenario",
+        model_path,
+        mutable=["technodata/Agents.csv", "technodata/*/Technodata.csv"],
+    )
     if (model_path / "Results").exists():
         shutil.rmtree(model_path / "Results")
 
-    # Copy agent A1 -> A2
-    add_agent(
-        model_path,
-        agent_name="A2",
-        copy_from="A1",
-        agentshare_new="Agent2",
+    agents_file = model_path / "technodata" / "Agents.csv"
+
+    # Copy agent A1 -> A2, and split population and capacity between the two agents
+    patch = ScenarioPatch()
+    patch.add_agent(agent_name="A2", copy_from="A1", agentshare_new="Agent2")
+    patch.edit_csv(
+        agents_file,
+        [
+            CsvEdit("Quantity", 0.5, where={"Name": "A1"}, skip_first_data_row=False),
+            CsvEdit("Quantity", 0.5, where={"Name": "A2"}, skip_first_data_row=False),
+        ],
     )
-
-    # Split population between the two agents
-    agents_file = model_path / "technodata/Agents.csv"
-    df = pd.read_csv(agents_file)
-    df.loc[:, "Quantity"] = 0.5
-    df.to_csv(agents_file, index=False)
-
-    # Split capacity equally between the two agents
     for sector in get_sectors(model_path):
-        technodata_file = model_path / f"technodata/{sector}/Technodata.csv"
-        df = pd.read_csv(technodata_file)
-        df.loc[1:, "Agent1"] = 0.5
-        df.loc[1:, "Agent2"] = 0.5
-        df.to_csv(technodata_file, index=False)
+        technodata_file = model_path / "technodata" / sector / "Technodata.csv"
+        patch.edit_csv(technodata_file, [CsvEdit(["Agent1", "Agent2"], 0.5)])
+    apply_patch(model_path, patch)
 
 
 def generate_model_2():
@@ -54,30 +58,38 @@ def generate_model_2():
     """
     model_name = "2-multiple-objective"
     model_path = parent_path / model_name
-    if model_path.exists():
-        shutil.rmtree(model_path)
 
     # Starting point: copy model from previous tutorial
-    shutil.copytree(parent_path / "1-single-objective", model_path)
+    copy_scenario(
+        parent_path / "1-single-objective",
+        model_path,
+        mutable=["technodata/Agents.csv", "technodata/residential/Technodata.csv"],
+    )
     if (model_path / "Results").exists():
         shutil.rmtree(model_path / "Results")
 
     # Add second objective for agent A2
-    agents_file = model_path / "technodata/Agents.csv"
-    df = pd.read_csv(agents_file)
-    df.loc[df["Name"] == "A2", "Objective2"] = "EAC"
-    df.loc[df["Name"] == "A2", "DecisionMethod"] = "weighted_sum"
-    df.loc[df["Name"] == "A2", ["ObjData1", "ObjData2"]] = 0.5
-    df.loc[df["Name"] == "A2", "Objsort2"] = True
-    df.to_csv(agents_file, index=False)
+    with CsvBatch(model_path) as batch:
+        df = batch["technodata/Agents.csv"]
+        a2 = (df["Name"] == "A2").to_numpy()
+        df.loc[a2, "Objective2"] = "EAC"
+        df.loc[a2, "DecisionMethod"] = "weighted_sum"
+        df.loc[a2, ["ObjData1", "ObjData2"]] = 0.5
+        df.loc[a2, "Objsort2"] = True
 
     # Modify residential sector MaxCapacityGrowth
-    technodata_file = model_path / "technodata/residential/Technodata.csv"
-    df = pd.read_csv(technodata_file)
-    df.loc[1:, "MaxCapacityGrowth"] = 0.4
-    df.to_csv(technodata_file, index=False)
+    technodata_file = model_path / "technodata" / "residential" / "Technodata.csv"
+    set_column_constant(technodata_file, "MaxCapacityGrowth", 0.4)
 
 
-if __name__ == "__main__":
+def main() -> None:
+    """Generates all models for tutorial 2.
+
+    The second model starts from the first one, so they are generated in order.
+    """
     generate_model_1()
     generate_model_2()
+
+
+if __name__ == "__main__":
+    main()
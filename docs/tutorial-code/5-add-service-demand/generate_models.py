@@ -1,12 +1,58 @@
+import csv
 import shutil
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
-from muse.wizard import add_new_commodity, add_new_process
+from muse.wizard import (
+    CsvBatch,
+    CsvEdit,
+    ScenarioPatch,
+    apply_patch,
+    copy_scenario,
+    read_csv,
+)
 
 parent_path = Path(__file__).parent
 
 
+def write_csv(path: Path, df: pd.DataFrame) -> None:
+    """Writes a csv file with the csv module, bypassing pandas' formatting.
+
+    Cells are written with ``str``, which matches pandas for the string and integer
+    cells of these files. Missing values are written as empty cells.
+    """
+    # the file may be hardlinked to the source model: replace it, never write through
+    path.unlink(missing_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(df.columns)
+        writer.writerows(df.fillna("").itertuples(index=False, name=None))
+
+
+@dataclass(frozen=True)
+class ModelFiles:
+    """Paths to the csv files modified by this tutorial."""
+
+    projections: Path
+    commout: Path
+    commin: Path
+    residential_technodata: Path
+    power_technodata: Path
+
+    @classmethod
+    def from_model(cls, model_path: Path) -> "ModelFiles":
+        technodata = model_path / "technodata"
+        return cls(
+            projections=model_path / "input" / "Projections.csv",
+            commout=technodata / "residential" / "CommOut.csv",
+            commin=technodata / "residential" / "CommIn.csv",
+            residential_technodata=technodata / "residential" / "Technodata.csv",
+            power_technodata=technodata / "power" / "Technodata.csv",
+        )
+
+
 def generate_model_1():
     """Generates the first model for tutorial 5.
 
@@ -15,64 +61,89 @@ def generate_model_1():
     """
     model_name = "1-exogenous-demand"
     model_path = parent_path / model_name
-    if model_path.exists():
-        shutil.rmtree(model_path)
 
     # Starting point: copy model from tutorial 4
-    shutil.copytree(
+    copy_scenario(
         parent_path / "../4-modify-timing-data/1-modify-timeslices",
         model_path,
+        mutable=[
+            "input/*.csv",
+            "technodata/preset/*",
+            "technodata/residential/*.csv",
+            "technodata/power/Technodata.csv",
+        ],
     )
     if (model_path / "Results").exists():
         shutil.rmtree(model_path / "Results")
+    files = ModelFiles.from_model(model_path)
+
+    # Collect all modifications, so that each file is read and written once
+    patch = ScenarioPatch()
 
     # Copy gas commodity in power sector -> cook
-    add_new_commodity(model_path, "cook", "residential", "heat")
+    patch.add_new_commodity("cook", "residential", "heat")
 
     # Modify cook projections
-    projections_file = model_path / "input/Projections.csv"
-    df = pd.read_csv(projections_file)
-    df.loc[1:, "cook"] = 100
-    df.to_csv(projections_file, index=False)
+    patch.edit_csv(files.projections, [CsvEdit("cook", 100)])
 
     # Copy processes in power sector -> cook
-    add_new_process(model_path, "electric_stove", "residential", "heatpump")
-    add_new_process(model_path, "gas_stove", "residential", "gasboiler")
+    patch.add_new_process("electric_stove", "residential", "heatpump")
+    patch.add_new_process("gas_stove", "residential", "gasboiler")
+
+    # Modify input commodities
+    patch.edit_csv(files.commin, [CsvEdit("cook", 0)])
 
     # Modify output commodities
-    commout_file = model_path / "technodata/residential/CommOut.csv"
-    df = pd.read_csv(commout_file)
-    df.loc[1:, "cook"] = 0
-    df.loc[df["ProcessName"] == "gas_stove", df.columns[-6:]] = [0, 0, 0, 50, 0, 1]
-    df.loc[df["ProcessName"] == "electric_stove", df.columns[-6:]] = [0, 0, 0, 0, 0, 1]
-    df.to_csv(commout_file, index=False)
+    commodities = ["electricity", "gas", "heat", "CO2f", "wind", "cook"]
+    patch.edit_csv(
+        files.commout,
+        [
+            CsvEdit("cook", 0),
+            CsvEdit(
+                commodities, [0, 0, 0, 50, 0, 1], where={"ProcessName": "gas_stove"}
+            ),
+            CsvEdit(
+                commodities, [0, 0, 0, 0, 0, 1], where={"ProcessName": "electric_stove"}
+            ),
+        ],
+    )
 
-    # Modify input commodities
-    commin_file = model_path / "technodata/residential/CommIn.csv"
-    df = pd.read_csv(commin_file)
-    df.loc[1:, "cook"] = 0
-    df.to_csv(commin_file, index=False)
-
-    # Change cap_par, Fuel and EndUse
-    technodata_file = model_path / "technodata/residential/Technodata.csv"
-    df = pd.read_csv(technodata_file)
-    df.loc[df["ProcessName"] == "gas_stove", "Fuel"] = "gas"
-    df.loc[df["ProcessName"] == "electric_stove", "Fuel"] = "electricity"
-    df.loc[df["ProcessName"] == "gas_stove", "EndUse"] = "cook"
-    df.loc[df["ProcessName"] == "electric_stove", "EndUse"] = "cook"
-    df.to_csv(technodata_file, index=False)
-
-    # Increase capacity limits in power sector
-    technodata_file = model_path / "technodata/power/Technodata.csv"
-    df = pd.read_csv(technodata_file)
-    df.loc[1:, "MaxCapacityAddition"] = pd.to_numeric(df.loc[1:, "MaxCapacityAddition"])
-    df.loc[1:, "MaxCapacityAddition"] *= 2
-    df.loc[1:, "MaxCapacityGrowth"] = pd.to_numeric(df.loc[1:, "MaxCapacityGrowth"])
-    df.loc[1:, "MaxCapacityGrowth"] *= 2
-    df.loc[1:, "TotalCapacityLimit"] = pd.to_numeric(df.loc[1:, "TotalCapacityLimit"])
-    df.loc[1:, "TotalCapacityLimit"] *= 2
-    df.to_csv(technodata_file, index=False)
+    # Change Fuel and EndUse
+    patch.edit_csv(
+        files.residential_technodata,
+        [
+            CsvEdit(
+                ["Fuel", "EndUse"], ["gas", "cook"], where={"ProcessName": "gas_stove"}
+            ),
+            CsvEdit(
+                ["Fuel", "EndUse"],
+                ["electricity", "cook"],
+                where={"ProcessName": "electric_stove"},
+            ),
+        ],
+    )
+
+    apply_patch(model_path, patch)
+
+    # The units row makes every column a string column, so columns are read as strings
+    # directly, without type inference
+    reader = partial(read_csv, dtype=str)
+    with CsvBatch(model_path, reader=reader, writer=write_csv) as batch:
+        # Increase capacity limits in power sector
+        df = batch[files.power_technodata]
+        for column in (
+            "MaxCapacityAddition",
+            "MaxCapacityGrowth",
+            "TotalCapacityLimit",
+        ):
+            i = df.columns.get_loc(column)
+            df.iloc[1:, i] = pd.to_numeric(df.iloc[1:, i]) * 2
+
+
+def main() -> None:
+    """Generates all models for tutorial 5."""
+    generate_model_1()
 
 
 if __name__ == "__main__":
-    generate_model_1()
+    main()
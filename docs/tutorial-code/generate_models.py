@@ -1,8 +1,39 @@
 import subprocess
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
+
+parent_path = Path(__file__).parent
+
+DEPENDENCIES = {
+    "2-add-agent": "1-add-new-technology",
+    "3-add-region": "1-add-new-technology",
+    "4-modify-timing-data": "3-add-region",
+    "5-add-service-demand": "4-modify-timing-data",
+}
+"""Tutorials whose models start from the models of another tutorial."""
+
+
+def generate(tutorial: Path, dependency: Optional[Future] = None) -> None:
+    """Generates the models of a tutorial, once its dependency has been generated."""
+    if dependency is not None:
+        dependency.result()
+    subprocess.call([sys.executable, str(tutorial / "generate_models.py")])
+
 
 if __name__ == "__main__":
-    for tutorial in sorted(Path(__file__).parent.iterdir()):
-        if (tutorial / "generate_models.py").exists():
-            subprocess.call([sys.executable, str(tutorial / "generate_models.py")])
+    tutorials = sorted(
+        tutorial
+        for tutorial in parent_path.iterdir()
+        if (tutorial / "generate_models.py").exists()
+    )
+    # Tutorials are submitted in order, so a dependency is always picked up by a
+    # worker before the tutorials waiting on it
+    futures: dict[str, Future] = {}
+    with ThreadPoolExecutor() as executor:
+        for tutorial in tutorials:
+            dependency = futures.get(DEPENDENCIES.get(tutorial.name, ""))
+            futures[tutorial.name] = executor.submit(generate, tutorial, dependency)
+    for future in futures.values():
+        future.result()
@@ -98,12 +98,15 @@ year:
 
 from __future__ import annotations
 
-from collections.abc import Mapping, MutableMapping, Sequence
+import os
+from collections.abc import Hashable, Iterable, Mapping, MutableMapping, Sequence
 from dataclasses import dataclass
 from enum import Enum, auto
+from functools import lru_cache
 from typing import (
     Any,
     Callable,
+    NamedTuple,
     Optional,
     Union,
     cast,
@@ -216,7 +219,17 @@ def factory(
 
     The standard settings can be a string naming the constraint, a dictionary including
     at least "name", or a list of strings and dictionaries.
+
+    The constraints defined in this module only need the replacement technologies of
+    the current year. Those are selected once and shared by them. Constraints
+    registered elsewhere, e.g. by plugins, receive the full technologies dataset.
+
+    The constraints are computed one after the other. Setting the environment variable
+    ``MUSE_PARALLEL_CONSTRAINTS`` to ``True`` computes them concurrently instead, in a
+    pool of threads. The constraints are small and mostly hold the GIL, so this is only
+    worthwhile for expensive custom constraints.
     """
+    from concurrent.futures import ThreadPoolExecutor
     from functools import partial
 
     if not settings:
@@ -240,6 +253,9 @@ def factory(
     constraint_closures = [
         partial(CONSTRAINTS[name], **param) for name, param in zip(names, parameters)
     ]
+    builtin = {
+        closure: closure.func.__module__ == __name__ for closure in constraint_closures
+    }
 
     def constraints(
         demand: xr.DataArray,
@@ -251,15 +267,45 @@ def factory(
     ) -> list[Constraint]:
         if year is None:
             year = int(market.year.min())
-        constraints = [
-            function(demand, assets, search_space, market, technologies, year=year)
-            for function in constraint_closures
-        ]
+        techs = _constraint_technologies(technologies, search_space, year)
+
+        def compute(function: partial) -> Constraint | None:
+            data = techs if builtin[function] else technologies
+            return function(demand, assets, search_space, market, data, year=year)
+
+        if (
+            len(constraint_closures) > 1
+            and os.environ.get("MUSE_PARALLEL_CONSTRAINTS") == "True"
+        ):
+            with ThreadPoolExecutor(max_workers=len(constraint_closures)) as executor:
+                constraints = list(executor.map(compute, constraint_closures))
+        else:
+            constraints = [compute(function) for function in constraint_closures]
         return [constraint for constraint in constraints if constraint is not None]
 
     return constraints
 
 
+def _constraint_technologies(
+    technologies: xr.Dataset, search_space: xr.DataArray, year: int
+) -> xr.Dataset:
+    """Selects the technologies shared by the built-in constraints of a given year.
+
+    The built-in constraints each select the replacement technologies and the year of
+    the investment. Selecting them once beforehand means each constraint indexes a
+    smaller dataset. The year is kept as a dimension of length one, so that the
+    constraints' own selections still apply.
+    """
+    selection: dict[str, Any] = {}
+    if "technology" in technologies.dims and "replacement" in search_space.dims:
+        replacement = search_space.replacement.values
+        if np.isin(replacement, technologies.technology.values).all():
+            selection["technology"] = replacement
+    if "year" in technologies.dims and int(year) in technologies.year.values:
+        selection["year"] = [int(year)]
+    return technologies.sel(selection) if selection else technologies
+
+
 @register_constraints
 def max_capacity_expansion(
     demand: xr.DataArray,
@@ -306,7 +352,7 @@ def max_capacity_expansion(
 
             \Gamma_t^{r, i} \geq 0
     """
-    from muse.utilities import filter_input, reduce_assets
+    from muse.utilities import filter_input
 
     if year is None:
         year = int(market.year.min())
@@ -316,14 +362,15 @@ def max_capacity_expansion(
         forecast = next(int(u) for u in sorted(market.year - year) if u > 0)
     forecast_year = year + forecast
 
-    capacity = (
-        reduce_assets(
-            assets.capacity,
-            coords={"technology", "region"}.intersection(assets.capacity.coords),
-        )
-        .interp(year=[year, forecast_year], method=interpolation)
-        .ffill("year")
+    capacity = _sum_by_technology(
+        assets.capacity,
+        coords={"technology", "region"}.intersection(assets.capacity.coords),
     )
+    if interpolation == "linear":
+        capacity = _interp_years(capacity, [year, forecast_year])
+    else:
+        capacity = capacity.interp(year=[year, forecast_year], method=interpolation)
+    capacity = capacity.ffill("year")
     # case with technology and region in asset dimension
     if capacity.region.dims != ():
         names = [u for u in capacity.asset.coords if capacity[u].dims == ("asset",)]
@@ -367,11 +414,16 @@ def max_capacity_expansion(
     initial = capacity.sel(year=year, drop=True)
 
     growth_cap = initial * (max_growth * forecast + 1) - forecasted
-    growth_cap = growth_cap.where(growth_cap > 0, total_cap)
 
-    zero_cap = add_cap.where(add_cap < total_cap, total_cap)
-    with_growth = zero_cap.where(zero_cap < growth_cap, growth_cap)
-    b = with_growth.where(initial > 0, zero_cap)
+    b = xr.apply_ufunc(
+        _capacity_expansion_limit,
+        add_cap,
+        total_cap,
+        growth_cap,
+        initial,
+        join="exact",
+        keep_attrs=True,
+    )
 
     if b.region.dims == ():
         capa = 1
@@ -385,6 +437,92 @@ def max_capacity_expansion(
     )
 
 
+def _capacity_expansion_limit(
+    add_cap: np.ndarray,
+    total_cap: np.ndarray,
+    growth_cap: np.ndarray,
+    initial: np.ndarray,
+) -> np.ndarray:
+    """Combines the addition, growth and total limits on plain numpy arrays.
+
+    Follows the semantics of chaining :py:meth:`xarray.DataArray.where`: a comparison
+    involving NaN selects the second operand, so NaN does not propagate as it would
+    with :py:func:`numpy.minimum`. The growth limit only applies to existing assets,
+    hence the last two selections are combined into a single mask.
+    """
+    growth_cap = np.where(growth_cap > 0, growth_cap, total_cap)
+    zero_cap = np.where(add_cap < total_cap, add_cap, total_cap)
+    use_growth = (initial > 0) & ~(zero_cap < growth_cap)
+    return np.where(use_growth, growth_cap, zero_cap)
+
+
+def _interp_years(data: xr.DataArray, years: Sequence[int]) -> xr.DataArray:
+    """Linearly interpolates the data to the given years.
+
+    Equivalent to ``data.interp(year=years)``, with the same arithmetic as the
+    :py:class:`scipy.interpolate.interp1d` object xarray creates for each call, but
+    without its set-up cost. Years outside of the input range are NaN.
+    """
+    x = data.year.values
+    if (
+        data.dims.count("year") != 1
+        or len(x) < 2
+        or data.dtype.kind != "f"
+        or np.any(np.diff(x) <= 0)
+        or any("year" in data[k].dims for k in data.coords if k != "year")
+    ):
+        return data.interp(year=years)
+
+    target = np.asarray(years)
+    hi = np.searchsorted(x, target).clip(1, len(x) - 1)
+    lo = hi - 1
+    values = np.moveaxis(data.values, data.get_axis_num("year"), -1)
+    slope = (values[..., hi] - values[..., lo]) / (x[hi] - x[lo])
+    values = slope * (target - x[lo]) + values[..., lo]
+    values[..., (target < x[0]) | (target > x[-1])] = np.nan
+
+    result = data.isel(year=lo).assign_coords(year=target)
+    return result.copy(data=np.moveaxis(values, -1, data.get_axis_num("year")))
+
+
+def _sum_by_technology(capacity: xr.DataArray, coords: Iterable[str]) -> xr.DataArray:
+    """Sums the capacity of the assets sharing the same technology (and region).
+
+    Equivalent to :py:func:`~muse.utilities.reduce_assets` with the default summation,
+    but the assets are grouped with :py:func:`pandas.factorize` and summed with
+    :py:func:`numpy.add.reduceat`, rather than with xarray's groupby.
+    """
+    from muse.utilities import reduce_assets
+
+    names = [
+        k for k in coords if k in capacity.coords and capacity[k].dims == ("asset",)
+    ]
+    if not names or capacity.asset.size == 0:
+        return cast(xr.DataArray, reduce_assets(capacity, coords=coords))
+
+    index = pd.MultiIndex.from_arrays([capacity[k].values for k in names])
+    codes, groups = index.factorize()
+    order = np.argsort(codes, kind="stable")
+    starts = np.searchsorted(codes[order], np.arange(len(groups)))
+
+    axis = cast(int, capacity.get_axis_num("asset"))
+    values = capacity.values
+    if np.issubdtype(values.dtype, np.floating):
+        # xarray skips NaNs when summing
+        values = np.where(np.isnan(values), 0, values)
+    summed = np.add.reduceat(values.take(order, axis=axis), starts, axis=axis)
+
+    result = xr.DataArray(
+        summed,
+        coords={k: v for k, v in capacity.coords.items() if "asset" not in v.dims},
+        dims=capacity.dims,
+        name=capacity.name,
+    )
+    for i, k in enumerate(names):
+        result[k] = "asset", groups.get_level_values(i)
+    return result
+
+
 @register_constraints
 def demand(
     demand: xr.DataArray,
@@ -465,18 +603,20 @@ def max_production(
         .sel(**kwargs)
         .drop_vars("technology")
     )
-    capacity = convert_timeslice(
+    # negated before expanding over assets, so that only the expansion is copied
+    capacity = -convert_timeslice(
         techs.fixed_outputs * techs.utilization_factor,
         market.timeslice,
         QuantityType.EXTENSIVE,
     )
     if "asset" not in capacity.dims and "asset" in search_space.dims:
-        capacity = capacity.expand_dims(asset=search_space.asset)
+        # expand_dims returns a read-only view
+        capacity = capacity.expand_dims(asset=search_space.asset).copy()
     production = ones_like(capacity)
     b = zeros_like(production)
     # Include maxaddition constraint in max production to match region-dst_region
     if "dst_region" in assets.dims:
-        b = b.expand_dims(dst_region=assets.dst_region)
+        b = b.expand_dims(dst_region=assets.dst_region).copy()
         capacity = capacity.rename(region="src_region")
         production = production.rename(region="src_region")
         maxadd = technologies.max_capacity_addition.rename(region="src_region")
@@ -490,7 +630,7 @@ def max_production(
         production = production * maxadd
         b = b.rename(region="src_region")
     return xr.Dataset(
-        dict(capacity=-cast(np.ndarray, capacity), production=production, b=b),
+        dict(capacity=capacity, production=production, b=b),
         attrs=dict(kind=ConstraintKind.UPPER_BOUND),
     )
 
@@ -664,8 +804,6 @@ def lp_costs(
         >>> lpcosts.production.dims
         ('timeslice', 'asset', 'replacement', 'commodity')
     """
-    from xarray import zeros_like
-
     from muse.commodities import is_enduse
     from muse.timeslices import convert_timeslice
 
@@ -689,7 +827,9 @@ def lp_costs(
     #                                'commodity': 1
     #                                'replacement': 2,
     #                                'timeslice': 3})
-    production = zeros_like(ts_costs * fouts)
+    # the product gives the layout and coordinates, its new buffer is zeroed in place
+    production = ts_costs * fouts
+    cast(np.ndarray, production.values).fill(0)
     for dim in production.dims:
         if isinstance(production.get_index(dim), pd.MultiIndex):
             production = drop_timeslice(production)
@@ -703,33 +843,40 @@ def merge_lp(
 ) -> tuple[xr.Dataset, list[Constraint]]:
     """Unify coordinate systems of costs and constraints.
 
-    In practice, this function brings costs and constraints into a single xr.Dataset and
-    then splits things up again. This ensures the dimensions are not only compatible,
-    but also such that that their order in memory is the same.
+    In practice, this function aligns the costs and the constraints all together, with
+    an outer join, so that the dimensions are compatible. The variables keep the order
+    of their dimensions in memory.
     """
-    from xarray import merge
+    aligned = xr.align(costs, *constraints, join="outer")
 
-    data = merge(
-        [costs]
-        + [
-            constraint.rename(
-                b=f"b{i}", capacity=f"capacity{i}", production=f"production{i}"
-            )
-            for i, constraint in enumerate(constraints)
-        ]
-    )
+    # coordinates are shared, as they would be within a single dataset
+    coords: dict[Hashable, xr.Variable] = {}
+    for data in aligned:
+        for name, coord in data.coords.items():
+            coords.setdefault(name, coord.variable)
 
-    unified_costs = cast(xr.Dataset, data[["capacity", "production"]])
-    unified_constraints = [
-        xr.Dataset(
+    def unify(data: xr.Dataset) -> xr.Dataset:
+        return data.assign_coords(
             {
-                "capacity": data[f"capacity{i}"],
-                "production": data[f"production{i}"],
-                "b": data[f"b{i}"],
-            },
-            attrs=constraint.attrs,
+                k: v
+                for k, v in coords.items()
+                if k not in data.coords and set(v.dims).issubset(data.dims)
+            }
+        )
+
+    unified_costs = unify(cast(xr.Dataset, aligned[0][["capacity", "production"]]))
+    unified_constraints = [
+        unify(
+            xr.Dataset(
+                {
+                    "capacity": constraint.capacity,
+                    "production": constraint.production,
+                    "b": constraint.b,
+                },
+                attrs=constraint.attrs,
+            )
         )
-        for i, constraint in enumerate(constraints)
+        for constraint in aligned[1:]
     ]
 
     return unified_costs, unified_constraints
@@ -756,6 +903,26 @@ def lp_constraint(constraint: Constraint, lpcosts: xr.Dataset) -> Constraint:
     See :py:func:`muse.constraints.lp_constraint_matrix` for a more detailed explanation
     of the transformations applied here.
     """
+    b, capacity, production = _lp_constraint_arrays(constraint, lpcosts)
+    return xr.Dataset(
+        {"b": b, "capacity": capacity, "production": production}, attrs=constraint.attrs
+    )
+
+
+class _LpConstraint(NamedTuple):
+    """LP data of a constraint, before it is aligned with other constraints."""
+
+    b: xr.DataArray
+    capacity: xr.DataArray
+    production: xr.DataArray
+
+
+def _lp_constraint_arrays(constraint: Constraint, lpcosts: xr.Dataset) -> _LpConstraint:
+    """Transforms the constraint to LP data, without gathering it in a dataset.
+
+    Same as :py:func:`lp_constraint`, for the adapter which aligns the arrays of all
+    constraints at once anyway.
+    """
     constraint = constraint.copy(deep=False)
     for dim in constraint.dims:
         if isinstance(constraint.get_index(dim), pd.MultiIndex):
@@ -769,9 +936,7 @@ def lp_constraint(constraint: Constraint, lpcosts: xr.Dataset) -> Constraint:
         constraint.b, constraint.production, lpcosts.production
     )
     production = production.drop_vars(set(production.coords) - set(production.dims))
-    return xr.Dataset(
-        {"b": b, "capacity": capacity, "production": production}, attrs=constraint.attrs
-    )
+    return _LpConstraint(b, capacity, production)
 
 
 def lp_constraint_matrix(
@@ -877,31 +1042,31 @@ def lp_constraint_matrix(
 
     from numpy import eye
 
-    result = constraint.sum(set(constraint.dims) - set(lpcosts.dims) - set(b.dims))
+    b_dims, constraint_dims, lp_dims = b.dims, constraint.dims, lpcosts.dims
 
-    result = result.rename(
-        {k: f"d({k})" for k in set(result.dims).intersection(lpcosts.dims)}
-    )
-    result = result.rename(
-        {k: f"c({k})" for k in set(result.dims).intersection(b.dims)}
+    result = _sum_dims(
+        constraint, [k for k in constraint_dims if k not in lp_dims and k not in b_dims]
     )
-    expand = set(lpcosts.dims) - set(constraint.dims) - set(b.dims)
 
-    if expand == {"timeslice", "asset", "commodity"}:
-        expand = ["asset", "timeslice", "commodity"]
+    result = result.rename({k: f"d({k})" for k in result.dims if k in lp_dims})
+    result = result.rename({k: f"c({k})" for k in result.dims if k in b_dims})
+    expand = [k for k in lp_dims if k not in constraint_dims and k not in b_dims]
 
-    result = result.expand_dims(
-        {f"d({k})": lpcosts[k].rename({k: f"d({k})"}).set_index() for k in expand}
-    )
-    expand = set(b.dims) - set(constraint.dims) - set(lpcosts.dims)
+    if set(expand) == {"timeslice", "asset", "commodity"}:
+        expand = ["asset", "timeslice", "commodity"]
 
-    result = result.expand_dims(
-        {f"c({k})": b[k].rename({k: f"c({k})"}).set_index() for k in expand}
-    )
+    if expand:
+        result = result.expand_dims(
+            {f"d({k})": lpcosts[k].rename({k: f"d({k})"}).set_index() for k in expand}
+        )
+    expand = [k for k in b_dims if k not in constraint_dims and k not in lp_dims]
 
-    diag_dims = set(b.dims).intersection(lpcosts.dims)
+    if expand:
+        result = result.expand_dims(
+            {f"c({k})": b[k].rename({k: f"c({k})"}).set_index() for k in expand}
+        )
 
-    diag_dims = sorted(diag_dims)
+    diag_dims = sorted(k for k in b_dims if k in lp_dims)
 
     if diag_dims:
 
@@ -912,10 +1077,15 @@ def lp_constraint_matrix(
                 return lpcosts[dim].values
             return constraint[dim].values
 
+        labels = {k: get_dimension(k) for k in diag_dims}
+        diagonal = _diagonal_lp_matrix(result, labels)
+        if diagonal is not None:
+            return diagonal
+
         diagonal_submats = [
             xr.DataArray(
                 eye(len(b[k])),
-                coords={f"c({k})": get_dimension(k), f"d({k})": get_dimension(k)},
+                coords={f"c({k})": labels[k], f"d({k})": labels[k]},
                 dims=(f"c({k})", f"d({k})"),
             )
             for k in diag_dims
@@ -928,6 +1098,110 @@ def lp_constraint_matrix(
     return result
 
 
+def _sum_dims(data: xr.DataArray, dims: Sequence[Hashable]) -> xr.DataArray:
+    """Sums over the given dimensions, skipping NaN, as ``data.sum(dims)``.
+
+    Floating point data is reduced with :py:func:`numpy.add.reduce` directly, rather
+    than through xarray's reduction machinery.
+    """
+    if not dims or data.dtype.kind != "f":
+        return data.sum(dims)
+    values = data.values
+    summed = np.add.reduce(
+        np.where(np.isnan(values), 0, values), axis=data.get_axis_num(dims)
+    )
+    result = data.isel({k: 0 for k in dims}, drop=True).copy(data=summed)
+    result.attrs = {}
+    return result
+
+
+def _diagonal_lp_matrix(
+    result: xr.DataArray, labels: Mapping[Hashable, np.ndarray]
+) -> xr.DataArray | None:
+    """Multiplies an lp matrix by the identity over each of the given dimensions.
+
+    Equivalent to multiplying ``result`` by the product of the identity matrices with
+    dimensions ``c(k)`` and ``d(k)`` for each ``k`` in ``labels``. Rather than
+    materializing that product, the output is allocated once and only its diagonal
+    slots are written, through a view obtained with :py:func:`numpy.einsum`.
+
+    Returns None when the result would differ from the broadcasting product, i.e. when
+    ``result`` holds non-finite values, since zero times infinity is not zero, or when
+    its coordinates need aligning with the labels.
+
+    Axes along which ``result`` is a broadcast, e.g. for scalar constraints, are
+    reduced to length one before anything else, so that no full-size copy of
+    ``result`` is made.
+    """
+    values = result.values
+    values = values[
+        tuple(
+            slice(None) if stride else slice(0, 1)
+            for stride in cast(np.ndarray, values).strides
+        )
+    ]
+    if values.dtype.kind not in "biuf" or not np.isfinite(values).all():
+        return None
+    for k, label in labels.items():
+        index = result.indexes.get(f"d({k})")
+        if k != "timeslice" and index is not None and not index.equals(pd.Index(label)):
+            return None
+
+    # the c(k) and d(k) axes of a diagonal dimension share the same einsum subscript
+    subscripts: dict[Any, str] = {}
+    for k in labels:
+        subscripts[f"c({k})"] = subscripts[f"d({k})"] = chr(ord("a") + len(subscripts))
+    for dim in result.dims:
+        subscripts.setdefault(dim, chr(ord("a") + len(subscripts)))
+    new_dims = [
+        dim for k in labels for dim in (f"c({k})", f"d({k})") if dim not in result.dims
+    ]
+    dims = [*result.dims, *new_dims]
+    sizes: dict[Hashable, int] = dict(result.sizes)
+    sizes.update({f"c({k})": len(v) for k, v in labels.items()})
+    sizes.update({f"d({k})": len(v) for k, v in labels.items()})
+
+    data = np.zeros([sizes[d] for d in dims], dtype=np.result_type(values, float))
+    inputs = "".join(subscripts[d] for d in dims)
+    outputs = "".join(dict.fromkeys(inputs))
+    diagonal = np.einsum(f"{inputs}->{outputs}", data)
+
+    # the diagonal view has a single axis per diagonal dimension
+    source = {subscripts[d]: d for d in result.dims}
+    present = [source[u] for u in outputs if u in source]
+    expanded = values.transpose([result.get_axis_num(d) for d in present]).reshape(
+        [
+            values.shape[result.get_axis_num(source[u])] if u in source else 1
+            for u in outputs
+        ]
+    )
+    diagonal[...] = expanded
+
+    coords = dict(result.coords)
+    for k, label in labels.items():
+        coords[f"c({k})"] = f"c({k})", label
+        if k != "timeslice" and f"d({k})" not in result.dims:
+            coords[f"d({k})"] = f"d({k})", label
+    return xr.DataArray(data, coords=coords, dims=dims)
+
+
+@lru_cache(maxsize=256)
+def _lp_block_layout(
+    dims: tuple[Hashable, ...], shape: tuple[int, ...]
+) -> tuple[tuple[int, ...], tuple[int, int]]:
+    """Axes order and 2d shape of a flattened lp block.
+
+    The block is flattened with its dimensions in sorted order, the constraint
+    dimensions ``c(xxx)`` over the rows and the decision dimensions ``d(xxx)`` over the
+    columns. The layout depends only on the dimensions and the shape of the block,
+    which are the same from one investment to the next, hence it is cached.
+    """
+    axes = tuple(sorted(range(len(dims)), key=lambda i: cast(str, dims[i])))
+    rows = int(np.prod([shape[i] for i in axes if str(dims[i]).startswith("c")]))
+    columns = int(np.prod([shape[i] for i in axes if not str(dims[i]).startswith("c")]))
+    return axes, (rows, columns)
+
+
 @dataclass
 class ScipyAdapter:
     """Creates the input for the scipy solvers.
@@ -1051,18 +1325,16 @@ class ScipyAdapter:
     ) -> ScipyAdapter:
         lpcosts = lp_costs(technologies, costs, timeslices)
 
-        data = cls._unified_dataset(technologies, lpcosts, *constraints)
-
-        capacities = cls._selected_quantity(data, "capacity")
-
-        productions = cls._selected_quantity(data, "production")
-
-        bs = cls._selected_quantity(data, "b")
+        capacities, productions, bs = cls._unified_arrays(
+            technologies, lpcosts, *constraints
+        )
 
         kwargs = cls._to_scipy_adapter(capacities, productions, bs, *constraints)
 
         def to_muse(x: np.ndarray) -> xr.Dataset:
-            return ScipyAdapter._back_to_muse(x, capacities.costs, productions.costs)
+            return ScipyAdapter._back_to_muse(
+                x, capacities["costs"], productions["costs"]
+            )
 
         return ScipyAdapter(to_muse=to_muse, **kwargs)
 
@@ -1078,85 +1350,87 @@ class ScipyAdapter:
         }
 
     @staticmethod
-    def _unified_dataset(
+    def _unified_arrays(
         technologies: xr.Dataset, lpcosts: xr.Dataset, *constraints: Constraint
-    ) -> xr.Dataset:
-        """Creates single xr.Dataset from costs and constraints."""
-        from xarray import merge
-
+    ) -> tuple[
+        dict[str | int, xr.DataArray],
+        dict[str | int, xr.DataArray],
+        dict[int, xr.DataArray],
+    ]:
+        """Aligns costs and constraints without merging them into a single dataset.
+
+        Each constraint is transformed to LP data on its own, and the resulting arrays
+        are aligned together, as :py:func:`xarray.merge` would. Lower bound constraints
+        are negated. The capacity, production and b quantities are returned separately,
+        with the costs keyed by ``"costs"`` and the constraints by their index.
+        """
         assert "year" not in technologies.dims
 
-        coords = sorted([k for k in lpcosts.dims])
-        lpcosts_df = lpcosts.to_dataframe().reset_index().set_index(coords)
-        slpcosts = lpcosts_df.to_xarray()  # sorted lpcosts.dims
-
-        data = merge(
-            [lpcosts.rename({k: f"d({k})" for k in slpcosts.dims})]
-            + [
-                lp_constraint(constraint, lpcosts).rename(
-                    b=f"b{i}", capacity=f"capacity{i}", production=f"production{i}"
-                )
-                for i, constraint in enumerate(constraints)
-            ]
-        )
-
-        for i, constraint in enumerate(constraints):
+        lpconstraints = []
+        for constraint in constraints:
+            lpconstraint = _lp_constraint_arrays(constraint, lpcosts)
             if constraint.kind == ConstraintKind.LOWER_BOUND:
-                data[f"b{i}"] = -data[f"b{i}"]  # type: ignore
-                data[f"capacity{i}"] = -data[f"capacity{i}"]  # type: ignore
-                data[f"production{i}"] = -data[f"production{i}"]  # type: ignore
-
-        return data.transpose(*data.dims)
-
-    @staticmethod
-    def _selected_quantity(data: xr.Dataset, name: str) -> xr.Dataset:
-        result = cast(
-            xr.Dataset, data[[u for u in data.data_vars if str(u).startswith(name)]]
+                lpconstraint = _LpConstraint(*(-u for u in lpconstraint))
+            lpconstraints.append(lpconstraint)
+
+        costs = lpcosts.rename({k: f"d({k})" for k in lpcosts.dims})
+        aligned = xr.align(
+            costs.capacity,
+            costs.production,
+            *(
+                array
+                for lpconstraint in lpconstraints
+                for array in (
+                    lpconstraint.capacity,
+                    lpconstraint.production,
+                    lpconstraint.b,
+                )
+            ),
+            join="outer",
         )
+        arrays = [array.transpose(*sorted(array.dims, key=str)) for array in aligned]
 
-        return result.rename(
-            {
-                k: ("costs" if k == name else int(str(k).replace(name, "")))
-                for k in result.data_vars
-            }
-        )
+        capacities: dict[str | int, xr.DataArray] = {"costs": arrays[0]}
+        capacities.update(enumerate(arrays[2::3]))
+        productions: dict[str | int, xr.DataArray] = {"costs": arrays[1]}
+        productions.update(enumerate(arrays[3::3]))
+        bs = dict(enumerate(arrays[4::3]))
+        return capacities, productions, bs
 
     @staticmethod
     def _to_scipy_adapter(
-        capacities: xr.Dataset, productions: xr.Dataset, bs: xr.Dataset, *constraints
-    ):
+        capacities: Mapping[str | int, xr.DataArray],
+        productions: Mapping[str | int, xr.DataArray],
+        bs: Mapping[int, xr.DataArray],
+        *constraints: Constraint,
+    ) -> dict[str, Any]:
         def reshape(matrix: xr.DataArray) -> np.ndarray:
-            if list(matrix.dims) != sorted(matrix.dims):
-                new_dims = sorted(matrix.dims)
-                matrix = matrix.transpose(*new_dims)
-
             # before building LP we need to sort dimensions for consistency
-
-            size = np.prod(
-                [matrix[u].shape[0] for u in matrix.dims if str(u).startswith("c")]
-            )
-
-            return matrix.values.reshape((size, -1))
+            axes, shape = _lp_block_layout(matrix.dims, matrix.shape)
+            return cast(np.ndarray, matrix.values).transpose(axes).reshape(shape)
 
         def extract_bA(constraints, *kinds):
             indices = [i for i in range(len(bs)) if constraints[i].kind in kinds]
             capa_constraints = [reshape(capacities[i]) for i in indices]
             prod_constraints = [reshape(productions[i]) for i in indices]
-            if capa_constraints:
-                A: np.ndarray | None = np.concatenate(
-                    (
-                        np.concatenate(capa_constraints, axis=0),
-                        np.concatenate(prod_constraints, axis=0),
-                    ),
-                    axis=1,
-                )
-                b: np.ndarray | None = np.concatenate(
-                    [bs[i].stack(constraint=sorted(bs[i].dims)) for i in indices],
-                    axis=0,
-                )
-            else:
-                A = None
-                b = None
+            if not capa_constraints:
+                return None, None
+            # fill a preallocated matrix block by block, rather than
+            # concatenating rows and then columns
+            ncapa = capa_constraints[0].shape[1]
+            A = np.empty(
+                (
+                    sum(u.shape[0] for u in capa_constraints),
+                    ncapa + prod_constraints[0].shape[1],
+                ),
+                dtype=np.result_type(*capa_constraints, *prod_constraints),
+            )
+            start = 0
+            for capa, prod in zip(capa_constraints, prod_constraints):
+                A[start : start + capa.shape[0], :ncapa] = capa
+                A[start : start + capa.shape[0], ncapa:] = prod
+                start += capa.shape[0]
+            b = np.concatenate([reshape(bs[i]).reshape(-1) for i in indices])
             return A, b
 
         c = np.concatenate(
@@ -1,14 +1,43 @@
 from __future__ import annotations
 
+import csv
+import io
 import os
+import shutil
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from itertools import chain
 from pathlib import Path
-from typing import Callable
+from typing import IO, Any, Callable
 
+import numpy as np
 import pandas as pd
 from tomlkit import dumps, parse
 
 
+@contextmanager
+def _replacing(path: Path, newline: str | None = "") -> Iterator[IO[str]]:
+    """Opens a temporary file for writing, which then replaces the file at ``path``.
+
+    Replacing rather than overwriting the file leaves any other link to it untouched,
+    e.g. the source of a file hardlinked by :py:func:`copy_scenario`.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp, "w", newline=newline) as f:
+            yield f
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _write_csv(path: Path, df: pd.DataFrame) -> None:
+    with _replacing(path) as f:
+        df.to_csv(f, index=False, lineterminator="\n")
+
+
 def modify_toml(path_to_toml: Path, function: Callable):
     """Apply the specified function to modify a toml file.
 
@@ -20,7 +49,8 @@ def modify_toml(path_to_toml: Path, function: Callable):
     """
     data = parse(path_to_toml.read_text())
     function(data)
-    path_to_toml.write_text(dumps(data))
+    with _replacing(path_to_toml, newline=None) as f:
+        f.write(dumps(data))
 
 
 def get_sectors(model_path: Path) -> list[str]:
@@ -39,6 +69,231 @@ def get_sectors(model_path: Path) -> list[str]:
     ]
 
 
+def copy_scenario(source: Path, destination: Path, mutable: Iterable[str] = ()) -> None:
+    """Copy a model folder, hardlinking the files that will not be modified.
+
+    Files are hardlinked to the source where possible, and copied otherwise. The
+    functions of this module replace the files they write rather than overwriting them,
+    so they never modify the source through a link. Files matching one of the
+    ``mutable`` patterns are always copied, for files that will be modified in place
+    by other means, e.g. :py:meth:`pandas.DataFrame.to_csv`.
+
+    If the destination already exists, e.g. when re-generating a model, it is brought
+    in sync with the source: files that are already hardlinked to the source are kept
+    as they are, mutable files are copied afresh, and files and folders absent from the
+    source are removed.
+
+    Args:
+        source: Path to the model folder to copy from.
+        destination: Path to the new model folder.
+        mutable: Glob patterns, relative to the model folder, of the files that will be
+            modified in place in the new model, e.g. ``"technodata/*/Technodata.csv"``.
+    """
+    source = Path(source)
+    destination = Path(destination)
+    patterns = list(mutable)
+
+    # Remove whatever is not in the source, deepest paths first
+    if destination.exists():
+        for path in sorted(destination.rglob("*"), reverse=True):
+            if not (source / path.relative_to(destination)).exists():
+                if path.is_dir() and not path.is_symlink():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+
+    destination.mkdir(parents=True, exist_ok=True)
+    for src in sorted(source.rglob("*")):
+        relative = src.relative_to(source)
+        dst = destination / relative
+        if src.is_dir():
+            dst.mkdir(exist_ok=True)
+            continue
+
+        is_mutable = any(relative.match(pattern) for pattern in patterns)
+        if dst.exists():
+            if not is_mutable and dst.samefile(src):
+                continue
+            # never write through an existing file: it may be a link to the source
+            dst.unlink()
+        if not is_mutable:
+            try:
+                os.link(src, dst)
+                continue
+            except OSError:
+                pass
+        shutil.copy2(src, dst)
+
+
+@dataclass(frozen=True)
+class CsvEdit:
+    """An edit of the cells of a csv file, to be applied with :py:func:`edit_csv`.
+
+    Attributes:
+        columns: Name(s) of the column(s) to modify.
+        values: Value to set the columns to. If several columns are given, this can
+            also be a sequence or an array with one value per column.
+        where: If given, only the rows where each of these columns holds the given
+            value are modified.
+        skip_first_data_row: If True, the first row after the header is left untouched.
+            In most MUSE input files, this row holds the units.
+    """
+
+    columns: str | Sequence[str]
+    values: Any
+    where: Mapping[str, Any] | None = None
+    skip_first_data_row: bool = True
+
+
+def _apply_edits(header: list[str], data: list[list[str]], edits: Iterable[CsvEdit]):
+    """Apply edits in place to the rows of a csv file."""
+    recipe = []
+    for edit in edits:
+        columns = [edit.columns] if isinstance(edit.columns, str) else edit.columns
+        values = edit.values
+        if isinstance(values, str) or np.ndim(values) == 0:
+            values = [values] * len(columns)
+        else:
+            values = list(values)
+        if len(values) != len(columns):
+            raise ValueError(f"Got {len(values)} values for {len(columns)} columns")
+        targets = [(header.index(c), str(v)) for c, v in zip(columns, values)]
+        conditions = [(header.index(c), str(v)) for c, v in (edit.where or {}).items()]
+        recipe.append((int(edit.skip_first_data_row), conditions, targets))
+
+    # Group the rows by value once for each column used in a condition, so that each
+    # edit only visits the rows it selects
+    groups: dict[int, dict[str, list[int]]] = {}
+    for _, conditions, _ in recipe:
+        for i, _ in conditions:
+            if i not in groups:
+                groups[i] = {}
+                for n, row in enumerate(data):
+                    groups[i].setdefault(row[i], []).append(n)
+
+    for start, conditions, targets in recipe:
+        rows: Iterable[int]
+        if conditions:
+            selected = set.intersection(
+                *(set(groups[i].get(value, ())) for i, value in conditions)
+            )
+            rows = sorted(n for n in selected if n >= start)
+        else:
+            rows = range(start, len(data))
+        for n in rows:
+            for i, value in targets:
+                data[n][i] = value
+
+
+def _write_rows(path: Path, rows: Iterable[Sequence[str]]) -> None:
+    with _replacing(path) as f:
+        csv.writer(f, lineterminator="\n").writerows(rows)
+
+
+def edit_csv(path: Path, edits: Iterable[CsvEdit]) -> None:
+    """Apply edits to a csv file, without going through pandas.
+
+    The column indices of all edits are resolved once from the header, and the rows are
+    grouped by value once for each column used in a ``where`` condition. Edits are then
+    applied in order, each to the rows it selects. Only the targeted cells are
+    modified. All other cells are written back exactly as they were read.
+
+    Args:
+        path: Path to the csv file.
+        edits: Edits to apply, in order.
+    """
+    with open(path, newline="") as f:
+        header, *data = csv.reader(f)
+    _apply_edits(header, data, edits)
+    _write_rows(path, [header, *data])
+
+
+def set_column_constant(
+    path: Path,
+    columns: str | Sequence[str],
+    value: Any,
+    skip_first_data_row: bool = True,
+) -> None:
+    """Set columns of a csv file to a constant value, without going through pandas.
+
+    Shorthand for :py:func:`edit_csv` with a single :py:class:`CsvEdit`.
+
+    Args:
+        path: Path to the csv file.
+        columns: Name(s) of the column(s) to modify.
+        value: Value to set the columns to.
+        skip_first_data_row: If True, the first row after the header is left untouched.
+            In most MUSE input files, this row holds the units.
+    """
+    edit_csv(path, [CsvEdit(columns, value, skip_first_data_row=skip_first_data_row)])
+
+
+def read_csv(path: Path, **kwargs) -> pd.DataFrame:
+    """Read a csv file with the pyarrow engine of pandas, if pyarrow is installed.
+
+    Args:
+        path: Path to the csv file.
+        **kwargs: Further arguments to :py:func:`pandas.read_csv`.
+    """
+    try:
+        return pd.read_csv(path, engine="pyarrow", **kwargs)
+    except ImportError:
+        return pd.read_csv(path, **kwargs)
+
+
+class CsvBatch:
+    """Reads the csv files of a model at most once, and writes them back on exit.
+
+    Frames are loaded lazily on first access and the same frame is returned on
+    subsequent accesses, so it can be modified in place. All frames that have been
+    accessed are written back when the context exits without error.
+
+    Args:
+        model_path: Path to the model folder. Files are given relative to it.
+        reader: Function used to read the csv files.
+        writer: Function used to write the csv files. Defaults to
+            :py:meth:`pandas.DataFrame.to_csv`, without the index, replacing the file.
+    """
+
+    def __init__(
+        self,
+        model_path: Path,
+        reader: Callable[[Path], pd.DataFrame] = pd.read_csv,
+        writer: Callable[[Path, pd.DataFrame], None] | None = None,
+    ):
+        self.model_path = Path(model_path)
+        self.reader = reader
+        self.writer = writer
+        self.frames: dict[Path, pd.DataFrame] = {}
+
+    def _key(self, path: Path | str) -> Path:
+        return (self.model_path / path).resolve()
+
+    def __getitem__(self, path: Path | str) -> pd.DataFrame:
+        key = self._key(path)
+        if key not in self.frames:
+            self.frames[key] = self.reader(key)
+        return self.frames[key]
+
+    def __setitem__(self, path: Path | str, df: pd.DataFrame) -> None:
+        self.frames[self._key(path)] = df
+
+    def flush(self) -> None:
+        """Writes all loaded frames back to disk."""
+        for path, df in self.frames.items():
+            if self.writer is None:
+                _write_csv(path, df)
+            else:
+                self.writer(path, df)
+
+    def __enter__(self) -> CsvBatch:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.flush()
+
+
 def add_new_commodity(
     model_path: Path, commodity_name: str, sector: str, copy_from: str
 ) -> None:
@@ -50,31 +305,33 @@ def add_new_commodity(
         sector: Sector to add the commodity to.
         copy_from: Name of the commodity to copy from.
     """
+    with CsvBatch(model_path) as batch:
+        _add_new_commodity(batch, commodity_name, sector, copy_from)
+
+
+def _add_new_commodity(
+    batch: CsvBatch, commodity_name: str, sector: str, copy_from: str
+) -> None:
     # Add commodity to global commodities file
-    global_commodities_file = model_path / "input/GlobalCommodities.csv"
-    df = pd.read_csv(global_commodities_file)
+    global_commodities_file = "input/GlobalCommodities.csv"
+    df = batch[global_commodities_file]
     new_rows = df[df["Commodity"] == copy_from.capitalize()].assign(
         Commodity=commodity_name.capitalize(), CommodityName=commodity_name
     )
-    df = pd.concat([df, new_rows])
-    df.to_csv(global_commodities_file, index=False)
+    batch[global_commodities_file] = pd.concat([df, new_rows])
 
     # Add columns to additional files
     files_to_update = (
-        model_path / file
-        for file in (
-            f"technodata/{sector}/CommIn.csv",
-            f"technodata/{sector}/CommOut.csv",
-            "input/BaseYearImport.csv",
-            "input/BaseYearExport.csv",
-            "input/Projections.csv",
-        )
+        f"technodata/{sector}/CommIn.csv",
+        f"technodata/{sector}/CommOut.csv",
+        "input/BaseYearImport.csv",
+        "input/BaseYearExport.csv",
+        "input/Projections.csv",
     )
-    preset_files = (model_path / "technodata/preset").glob("*")
-    for file in chain(files_to_update, preset_files):
-        df = pd.read_csv(file)
+    preset_files = (batch.model_path / "technodata/preset").glob("*")
+    for file in chain(map(Path, files_to_update), preset_files):
+        df = batch[file]
         df[commodity_name] = df[copy_from]
-        df.to_csv(file, index=False)
 
 
 def add_new_process(
@@ -88,22 +345,25 @@ def add_new_process(
         sector: Sector to add the process to.
         copy_from: Name of the process to copy from.
     """
+    with CsvBatch(model_path) as batch:
+        _add_new_process(batch, process_name, sector, copy_from)
+
+
+def _add_new_process(
+    batch: CsvBatch, process_name: str, sector: str, copy_from: str
+) -> None:
     files_to_update = (
-        model_path / file
-        for file in (
-            f"technodata/{sector}/CommIn.csv",
-            f"technodata/{sector}/CommOut.csv",
-            f"technodata/{sector}/ExistingCapacity.csv",
-            f"technodata/{sector}/Technodata.csv",
-        )
+        f"technodata/{sector}/CommIn.csv",
+        f"technodata/{sector}/CommOut.csv",
+        f"technodata/{sector}/ExistingCapacity.csv",
+        f"technodata/{sector}/Technodata.csv",
     )
 
     for file in files_to_update:
-        df = pd.read_csv(file)
+        df = batch[file]
         new_rows = df[df["ProcessName"] == copy_from].copy()
         new_rows["ProcessName"] = process_name
-        df = pd.concat([df, new_rows])
-        df.to_csv(file, index=False)
+        batch[file] = pd.concat([df, new_rows])
 
 
 def add_price_data_for_new_year(
@@ -130,7 +390,7 @@ def add_price_data_for_new_year(
         df = pd.concat([df, new_rows], ignore_index=True)
         df.sort_values(by=["index", "Time"], inplace=True)
         df.drop(columns=["index"], inplace=True)
-        df.to_csv(file, index=False)
+        _write_csv(file, df)
 
 
 def add_agent(
@@ -151,8 +411,19 @@ def add_agent(
         agentshare_retrofit: Name of the 'retrofit' agent share for new agent. If None,
             the new agent will not have a 'retrofit' share.
     """
-    agents_file = model_path / "technodata/Agents.csv"
-    agents_df = pd.read_csv(agents_file)
+    with CsvBatch(model_path) as batch:
+        _add_agent(batch, agent_name, copy_from, agentshare_new, agentshare_retrofit)
+
+
+def _add_agent(
+    batch: CsvBatch,
+    agent_name: str,
+    copy_from: str,
+    agentshare_new: str | None = None,
+    agentshare_retrofit: str | None = None,
+) -> None:
+    agents_file = "technodata/Agents.csv"
+    agents_df = batch[agents_file]
 
     # Create mapping between share names
     copy_to_shares = {"New": agentshare_new, "Retrofit": agentshare_retrofit}
@@ -176,12 +447,11 @@ def add_agent(
             rows["Name"] = agent_name
             rows["AgentShare"] = copy_to_shares[share_type]
             agents_df = pd.concat([agents_df, rows])
-    agents_df.to_csv(agents_file, index=False)
+    batch[agents_file] = agents_df
 
     # Update technodata files for each sector
-    for sector in get_sectors(model_path):
-        technodata_file = model_path / f"technodata/{sector}/Technodata.csv"
-        technodata_df = pd.read_csv(technodata_file)
+    for sector in get_sectors(batch.model_path):
+        technodata_df = batch[f"technodata/{sector}/Technodata.csv"]
         for share_type in ["New", "Retrofit"]:
             if (
                 copy_to_shares[share_type]
@@ -191,7 +461,86 @@ def add_agent(
                 technodata_df[copy_to_shares[share_type]] = technodata_df[
                     copy_from_shares[share_type]
                 ]
-        technodata_df.to_csv(technodata_file, index=False)
+
+
+@dataclass
+class ScenarioPatch:
+    """Modifications to a model, to be applied with :py:func:`apply_patch`.
+
+    Each method mirrors the function of this module with the same name, minus the
+    ``model_path`` argument.
+
+    Attributes:
+        new_commodities: Arguments of :py:func:`add_new_commodity`.
+        new_processes: Arguments of :py:func:`add_new_process`.
+        new_agents: Arguments of :py:func:`add_agent`.
+        edits: Edits of the csv files, keyed by path relative to the model folder.
+    """
+
+    new_commodities: list[tuple[str, str, str]] = field(default_factory=list)
+    new_processes: list[tuple[str, str, str]] = field(default_factory=list)
+    new_agents: list[tuple[str, str, str | None, str | None]] = field(
+        default_factory=list
+    )
+    edits: dict[str, list[CsvEdit]] = field(default_factory=dict)
+
+    def add_new_commodity(self, commodity_name: str, sector: str, copy_from: str):
+        self.new_commodities.append((commodity_name, sector, copy_from))
+
+    def add_new_process(self, process_name: str, sector: str, copy_from: str):
+        self.new_processes.append((process_name, sector, copy_from))
+
+    def add_agent(
+        self,
+        agent_name: str,
+        copy_from: str,
+        agentshare_new: str | None = None,
+        agentshare_retrofit: str | None = None,
+    ):
+        self.new_agents.append(
+            (agent_name, copy_from, agentshare_new, agentshare_retrofit)
+        )
+
+    def edit_csv(self, path: Path | str, edits: Iterable[CsvEdit]):
+        self.edits.setdefault(str(path), []).extend(edits)
+
+
+def apply_patch(model_path: Path, patch: ScenarioPatch) -> None:
+    """Apply all the modifications of a patch, reading and writing each file once.
+
+    New commodities are added first, then new processes, then new agents, as if by
+    calling the corresponding functions of this module in that order. The csv edits
+    are applied last, to the cells as they would be written by pandas, so that they
+    also see the rows and columns added by the patch.
+
+    Args:
+        model_path: Path to the model folder.
+        patch: Modifications to apply.
+    """
+    batch = CsvBatch(model_path)
+    edits = {batch._key(path): file_edits for path, file_edits in patch.edits.items()}
+
+    def write(path: Path, df: pd.DataFrame) -> None:
+        if path not in edits:
+            _write_csv(path, df)
+            return
+        text = df.to_csv(index=False, lineterminator="\n")
+        header, *data = csv.reader(io.StringIO(text))
+        _apply_edits(header, data, edits.pop(path))
+        _write_rows(path, [header, *data])
+
+    batch.writer = write
+    with batch:
+        for commodity in patch.new_commodities:
+            _add_new_commodity(batch, *commodity)
+        for process in patch.new_processes:
+            _add_new_process(batch, *process)
+        for agent in patch.new_agents:
+            _add_agent(batch, *agent)
+
+    # Files that are only edited are never loaded into pandas
+    for path, file_edits in edits.items():
+        edit_csv(path, file_edits)
 
 
 def add_region(model_path: Path, region_name: str, copy_from: str) -> None:
@@ -235,7 +584,7 @@ def add_region(model_path: Path, region_name: str, copy_from: str) -> None:
         new_rows = df[df["RegionName"] == copy_from].copy()
         new_rows["RegionName"] = region_name
         df = pd.concat([df, new_rows])
-        df.to_csv(file_path, index=False)
+        _write_csv(file_path, df)
 
 
 def add_timeslice(model_path: Path, timeslice_name: str, copy_from: str) -> None:
@@ -252,7 +601,8 @@ def add_timeslice(model_path: Path, timeslice_name: str, copy_from: str) -> None
     timeslices = settings["timeslices"]["all-year"]["all-week"]
     copy_from_number = list(timeslices).index(copy_from) + 1
     timeslices[timeslice_name] = timeslices[copy_from]
-    settings_file.write_text(dumps(settings))
+    with _replacing(settings_file, newline=None) as f:
+        f.write(dumps(settings))
 
     # Loop through all preset files
     preset_dir = model_path / "technodata" / "preset"
@@ -263,4 +613,4 @@ def add_timeslice(model_path: Path, timeslice_name: str, copy_from: str) -> None
         new_rows["Timeslice"] = len(timeslices)
         df = pd.concat([df, new_rows])
         df = df.sort_values(by=["RegionName", "Timeslice"]).reset_index(drop=True)
-        df.to_csv(file_path, index=False)
+        _write_csv(file_path, df)
@@ -1,97 +1,162 @@
 import os
-import pathlib
-
-try:
-    from gooey import Gooey, GooeyParser
-except ImportError:
-    msg = "Gooey not installed! Make sure you install it to run the MUSE GUI version."
-    raise ImportError(msg)
-
-os.environ["MUSE_COLOR_LOG"] = "False"
-from muse import VERSION
-from muse.__main__ import muse_main
-
-parser = GooeyParser(description="Run a MUSE simulation")
-parser.add_argument(
-    "settings",
-    nargs="?",
-    default="settings.toml",
-    type=pathlib.Path,
-    help="Path to the TOML file with the simulation settings.",
-    widget="FileChooser",
-)
-parser.add_argument(
-    "--model",
-    default=None,
-    choices=["default", "multiple-agents", "medium", "minimum-service", "trade"],
-    help="Runs a model distributed with MUSE. "
-    "If provided, the 'settings' input is ignored.",
-)
-parser.add_argument(
-    "--copy",
-    default=None,
-    type=pathlib.Path,
-    help="Folder where to copy the model specified by the 'model' option. "
-    "The folder must not exist: this command will refuse to overwrite existing "
-    "data. Exits without running the model.",
-    widget="DirChooser",
-)
-parser.add_argument(
-    "--working-directory",
-    default=str(pathlib.Path.home()),
-    type=pathlib.Path,
-    help="Sets the working directory.",
-    widget="DirChooser",
-)
-
-
-menu = [
-    {
-        "name": "Help",
-        "items": [
-            {
-                "type": "Link",
-                "menuTitle": "Join the mailing list",
-                "url": "https://groups.google.com/g/muse-model",
-            },
-            {
-                "type": "Link",
-                "menuTitle": "Log a question in GitHub",
-                "url": "https://github.com/EnergySystemsModellingLab/MUSE_OS/issues/new/choose",
-            },
-            {
-                "type": "AboutDialog",
-                "menuTitle": "About MUSE",
-                "name": "MUSE",
-                "description": "ModUlar energy system Simulation Environment",
-                "version": VERSION,
-                "copyright": "2023",
-                "website": "https://www.imperial.ac.uk/muse-energy/",
-                "developer": "https://www.imperial.ac.uk/muse-energy/muser-group/",
-                "license": "BSD-3",
-            },
-        ],
-    }
-]
-
-
-@Gooey(
-    program_name=f"MUSE - v{VERSION}",
-    program_description="ModUlar energy system Simulation Environment",
-    menu=menu,
-    default_size=(600, 650),
-    progress_regex=r"^Finish simulation year \d+ \((?P<current>\d+)/(?P<total>\d+)\)!$",
-    progress_expr="current / total * 100",
-    timing_options={
-        "show_time_remaining": True,
-        "hide_time_remaining_on_complete": True,
-    },
-)
-def run():
-    args = parser.parse_args()
-    os.chdir(args.working_directory)
-    muse_main(args.settings, args.model, args.copy)
+import sys
+
+DESCRIPTION = "Run a MUSE simulation"
+
+
+def _as_path(path: str):
+    """Converts an argument to a path, importing :py:mod:`pathlib` on first use."""
+    import pathlib
+
+    return pathlib.Path(path)
+
+
+def _add_arguments(parser, widgets: bool = True):
+    """Adds the MUSE arguments to either a plain or a Gooey parser.
+
+    The ``widget`` options are only understood by Gooey, hence ``widgets=False``
+    for plain ``argparse`` parsers.
+    """
+
+    def widget(name: str) -> dict:
+        return {"widget": name} if widgets else {}
+
+    parser.add_argument(
+        "settings",
+        nargs="?",
+        default="settings.toml",
+        type=_as_path,
+        help="Path to the TOML file with the simulation settings.",
+        **widget("FileChooser"),
+    )
+    parser.add_argument(
+        "--model",
+        default=None,
+        choices=["default", "multiple-agents", "medium", "minimum-service", "trade"],
+        help="Runs a model distributed with MUSE. "
+        "If provided, the 'settings' input is ignored.",
+    )
+    parser.add_argument(
+        "--copy",
+        default=None,
+        type=_as_path,
+        help="Folder where to copy the model specified by the 'model' option. "
+        "The folder must not exist: this command will refuse to overwrite existing "
+        "data. Exits without running the model.",
+        **widget("DirChooser"),
+    )
+    parser.add_argument(
+        "--working-directory",
+        default=os.path.expanduser("~"),
+        type=_as_path,
+        help="Sets the working directory.",
+        **widget("DirChooser"),
+    )
+    return parser
+
+
+def _version() -> str:
+    # importlib.metadata pulls in pathlib, hence not imported at the top
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("MUSE_OS")
+    except PackageNotFoundError:
+        # e.g. running from a source checkout that is not installed
+        from muse import VERSION
+
+        return VERSION
+
+
+def _build_parser():
+    from gooey import GooeyParser
+
+    return _add_arguments(GooeyParser(description=DESCRIPTION))
+
+
+def _menu(version: str) -> list[dict]:
+    return [
+        {
+            "name": "Help",
+            "items": [
+                {
+                    "type": "Link",
+                    "menuTitle": "Join the mailing list",
+                    "url": "https://groups.google.com/g/muse-model",
+                },
+                {
+                    "type": "Link",
+                    "menuTitle": "Log a question in GitHub",
+                    "url": "https://github.com/EnergySystemsModellingLab/MUSE_OS/issues/new/choose",
+                },
+                {
+                    "type": "AboutDialog",
+                    "menuTitle": "About MUSE",
+                    "name": "MUSE",
+                    "description": "ModUlar energy system Simulation Environment",
+                    "version": version,
+                    "copyright": "2023",
+                    "website": "https://www.imperial.ac.uk/muse-energy/",
+                    "developer": "https://www.imperial.ac.uk/muse-energy/muser-group/",
+                    "license": "BSD-3",
+                },
+            ],
+        }
+    ]
+
+
+def main():
+    """Runs the MUSE GUI.
+
+    Everything happens here rather than at import time, so that importing this module
+    neither loads Gooey nor modifies the environment.
+    """
+    if {"-h", "--help"}.intersection(sys.argv[1:]) and "--ignore-gooey" not in sys.argv:
+        # print the help without starting wx and Gooey
+        from argparse import ArgumentParser
+
+        parser = ArgumentParser(description=DESCRIPTION)
+        _add_arguments(parser, widgets=False).parse_args()
+        sys.exit(0)
+
+    try:
+        from gooey import Gooey
+    except ImportError:
+        msg = (
+            "Gooey not installed! Make sure you install it to run the MUSE GUI version."
+        )
+        raise ImportError(msg)
+
+    os.environ["MUSE_COLOR_LOG"] = "False"
+    version = _version()
+
+    @Gooey(
+        program_name=f"MUSE - v{version}",
+        program_description="ModUlar energy system Simulation Environment",
+        menu=_menu(version),
+        default_size=(600, 650),
+        progress_regex=r"^Finish simulation year \d+ "
+        r"\((?P<current>\d+)/(?P<total>\d+)\)!$",
+        progress_expr="current / total * 100",
+        timing_options={
+            "show_time_remaining": True,
+            "hide_time_remaining_on_complete": True,
+        },
+    )
+    def gui():
+        args = _build_parser().parse_args()
+        # deferred, so that parsing errors do not wait for the scientific stack to load
+        from muse.__main__ import muse_main
+
+        os.chdir(args.working_directory)
+        muse_main(args.settings, args.model, args.copy)
+
+    gui()
+
+
+# name of the ``muse_gui`` console entry point
+run = main
 
 
 if "__main__" == __name__:
-    run()
+    main()
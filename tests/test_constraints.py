@@ -1,3 +1,4 @@
+from collections.abc import Hashable
 from typing import Union
 
 import numpy as np
@@ -188,6 +189,60 @@ def test_max_production_constraint_diagonal(constraint, lpcosts):
     assert stacked.values == approx(np.eye(stacked.shape[0]))
 
 
+def test_diagonal_lp_matrix(rng: np.random.Generator):
+    from muse.constraints import _diagonal_lp_matrix
+
+    labels: dict[Hashable, np.ndarray] = {
+        "asset": np.array([1, 2, 3]),
+        "replacement": np.array(["a", "b"]),
+    }
+    result = xr.DataArray(
+        rng.random((3, 4)),
+        coords={"d(asset)": labels["asset"]},
+        dims=("d(asset)", "d(commodity)"),
+    )
+    eyes = [
+        xr.DataArray(
+            np.eye(len(v)),
+            coords={f"c({k})": v, f"d({k})": v},
+            dims=(f"c({k})", f"d({k})"),
+        )
+        for k, v in labels.items()
+    ]
+    expected = result * eyes[0] * eyes[1]
+
+    actual = _diagonal_lp_matrix(result, labels)
+    assert actual is not None
+    assert actual.dims == expected.dims
+    xr.testing.assert_identical(actual, expected.rename(None))
+
+    # falls back when the result needs aligning with the labels
+    assert _diagonal_lp_matrix(result.isel({"d(asset)": [2, 1, 0]}), labels) is None
+
+    # broadcast inputs, as from scalar constraints, are not expanded beforehand
+    scalar = xr.DataArray(2.0).expand_dims({"d(commodity)": 4, "c(region)": 2})
+    expected = scalar * eyes[0] * eyes[1]
+    actual = _diagonal_lp_matrix(scalar, labels)
+    assert actual is not None
+    assert actual.dims == expected.dims
+    xr.testing.assert_identical(actual, expected.rename(None))
+
+
+def test_sum_dims(rng: np.random.Generator):
+    from muse.constraints import _sum_dims
+
+    data = xr.DataArray(
+        rng.random((3, 4, 2)),
+        coords={"x": [1, 2, 3], "y": list("abcd"), "u": ("y", [5, 6, 7, 8])},
+        dims=("x", "y", "z"),
+        attrs={"units": "PJ"},
+    )
+    data[0, 1, 0] = np.nan
+    data[1, :, :] = np.nan
+    for dims in ([], ["y"], ["x", "z"]):
+        xr.testing.assert_identical(_sum_dims(data, dims), data.sum(dims))
+
+
 def test_lp_constraint(constraint, lpcosts):
     from muse.constraints import lp_constraint
 
@@ -210,6 +265,24 @@ def test_lp_constraint(constraint, lpcosts):
     assert result.b.values == approx(0)
 
 
+def test_merge_lp(constraint, lpcosts):
+    from muse.constraints import lp_constraint, merge_lp
+
+    lpconstraint = lp_constraint(constraint, lpcosts)
+    costs = lpcosts.rename({k: f"d({k})" for k in lpcosts.dims})
+    expected = xr.merge(
+        [costs, lpconstraint.rename(capacity="c", production="p", b="b0")]
+    )
+
+    unified_costs, (unified,) = merge_lp(costs, lpconstraint)
+    assert set(unified.data_vars) == {"capacity", "production", "b"}
+    assert unified.attrs == lpconstraint.attrs
+    for name in ("capacity", "production"):
+        xr.testing.assert_identical(unified_costs[name], expected[name])
+    for dim in set(unified_costs.dims).intersection(unified.dims):
+        assert unified_costs.indexes[dim].equals(unified.indexes[dim])
+
+
 def test_to_scipy_adapter_maxprod(technologies, costs, max_production, timeslices):
     from muse.constraints import ScipyAdapter, lp_costs
 
@@ -235,6 +308,26 @@ def test_to_scipy_adapter_maxprod(technologies, costs, max_production, timeslice
     assert adapter.A_ub[:, capsize:] == approx(np.eye(prodsize))
 
 
+def test_to_scipy_adapter_decision_order(
+    technologies, costs, max_production, timeslices
+):
+    from muse.constraints import ScipyAdapter
+
+    technologies = technologies.interp(year=2025)
+
+    adapter = ScipyAdapter.factory(technologies, costs, timeslices, max_production)
+    capsize = costs.size
+    x = np.arange(adapter.c.size, dtype=float)
+    solution = adapter.to_muse(x)
+
+    # the production block of max_production is the identity, with rows in the same
+    # order as the columns: the solution must follow that order too
+    rows = adapter.A_ub[:, capsize:] @ x[capsize:]
+    production = solution.production.transpose(*sorted(solution.production.dims))
+    assert production.values.flatten() == approx(rows)
+    assert solution.capacity.values.flatten() == approx(x[:capsize])
+
+
 def test_to_scipy_adapter_demand(technologies, costs, demand_constraint, timeslices):
     from muse.constraints import ScipyAdapter, lp_costs
 
@@ -325,11 +418,10 @@ def test_back_to_muse_capacity(technologies, costs, timeslices):
     technologies = technologies.interp(year=2025)
 
     lpcosts = lp_costs(technologies, costs, timeslices)
-    data = ScipyAdapter._unified_dataset(technologies, lpcosts)
-    lpquantity = ScipyAdapter._selected_quantity(data, "capacity")
-    assert set(lpquantity.dims) == {"d(asset)", "d(replacement)"}
+    lpquantity, _, _ = ScipyAdapter._unified_arrays(technologies, lpcosts)
+    assert set(lpquantity["costs"].dims) == {"d(asset)", "d(replacement)"}
     copy = ScipyAdapter._back_to_muse_quantity(
-        lpquantity.costs.values, xr.zeros_like(lpquantity.costs)
+        lpquantity["costs"].values, xr.zeros_like(lpquantity["costs"])
     )
     assert (copy == lpcosts.capacity).all()
 
@@ -340,16 +432,15 @@ def test_back_to_muse_production(technologies, costs, timeslices):
     technologies = technologies.interp(year=2025)
 
     lpcosts = lp_costs(technologies, costs, timeslices)
-    data = ScipyAdapter._unified_dataset(technologies, lpcosts)
-    lpquantity = ScipyAdapter._selected_quantity(data, "production")
-    assert set(lpquantity.dims) == {
+    _, lpquantity, _ = ScipyAdapter._unified_arrays(technologies, lpcosts)
+    assert set(lpquantity["costs"].dims) == {
         "d(asset)",
         "d(replacement)",
         "d(timeslice)",
         "d(commodity)",
     }
     copy = ScipyAdapter._back_to_muse_quantity(
-        lpquantity.costs.values, xr.zeros_like(lpquantity.costs)
+        lpquantity["costs"].values, xr.zeros_like(lpquantity["costs"])
     )
     assert (copy == lpcosts.production).all()
 
@@ -360,9 +451,8 @@ def test_back_to_muse_all(technologies, costs, timeslices, rng: np.random.Genera
     technologies = technologies.interp(year=2025)
     lpcosts = lp_costs(technologies, costs, timeslices)
 
-    data = ScipyAdapter._unified_dataset(technologies, lpcosts)
-    lpcapacity = ScipyAdapter._selected_quantity(data, "capacity")
-    lpproduction = ScipyAdapter._selected_quantity(data, "production")
+    capacities, productions, _ = ScipyAdapter._unified_arrays(technologies, lpcosts)
+    lpcapacity, lpproduction = capacities["costs"], productions["costs"]
 
     lpcosts.capacity.values[:] = rng.integers(0, 10, lpcosts.capacity.shape)
     lpcosts.production.values[:] = rng.integers(0, 10, lpcosts.production.shape)
@@ -378,7 +468,7 @@ def test_back_to_muse_all(technologies, costs, timeslices, rng: np.random.Genera
     )
 
     copy = ScipyAdapter._back_to_muse(
-        x, xr.zeros_like(lpcapacity.costs), xr.zeros_like(lpproduction.costs)
+        x, xr.zeros_like(lpcapacity), xr.zeros_like(lpproduction)
     )
     assert copy.capacity.size + copy.production.size == x.size
     assert (copy.capacity == lpcosts.capacity).all()
@@ -391,9 +481,8 @@ def test_scipy_adapter_back_to_muse(technologies, costs, timeslices, rng):
     technologies = technologies.interp(year=2025)
     lpcosts = lp_costs(technologies, costs, timeslices)
 
-    data = ScipyAdapter._unified_dataset(technologies, lpcosts)
-    lpcapacity = ScipyAdapter._selected_quantity(data, "capacity")
-    lpproduction = ScipyAdapter._selected_quantity(data, "production")
+    capacities, productions, _ = ScipyAdapter._unified_arrays(technologies, lpcosts)
+    lpcapacity, lpproduction = capacities["costs"], productions["costs"]
 
     lpcosts.capacity.values[:] = rng.integers(0, 10, lpcosts.capacity.shape)
     lpcosts.production.values[:] = rng.integers(0, 10, lpcosts.production.shape)
@@ -494,12 +583,97 @@ def test_max_capacity_expansion(max_capacity_expansion):
     ).all()
 
 
+def test_capacity_expansion_limit(rng: np.random.Generator):
+    from muse.constraints import _capacity_expansion_limit
+
+    add, total, growth, initial = (
+        xr.DataArray(rng.uniform(-1, 1, (4, 5)), dims=("region", "replacement"))
+        for _ in range(4)
+    )
+    add[0, 0] = np.nan
+    growth[1, 1] = np.nan
+
+    growth_cap = growth.where(growth > 0, total)
+    zero_cap = add.where(add < total, total)
+    with_growth = zero_cap.where(zero_cap < growth_cap, growth_cap)
+    expected = with_growth.where(initial > 0, zero_cap)
+
+    actual = _capacity_expansion_limit(
+        add.values, total.values, growth.values, initial.values
+    )
+    assert actual == approx(expected.values, nan_ok=True)
+
+
+def test_interp_years(rng: np.random.Generator):
+    from muse.constraints import _interp_years
+
+    data = xr.DataArray(
+        rng.uniform(0, 10, (3, 4)),
+        coords={"asset": [1, 2, 3], "year": [2020, 2025, 2030, 2040]},
+        dims=("asset", "year"),
+    )
+    years = [2015, 2020, 2027, 2040, 2045]
+    actual = _interp_years(data, years)
+    expected = data.interp(year=years)
+    xr.testing.assert_identical(actual, expected)
+
+
+def test_factory_parallel(
+    market_demand, assets, search_space, market, technologies, monkeypatch
+):
+    from muse.constraints import factory
+
+    args = market_demand, assets, search_space, market, technologies
+    serial = factory()(*args)
+    monkeypatch.setenv("MUSE_PARALLEL_CONSTRAINTS", "True")
+    parallel = factory()(*args)
+    assert len(serial) == len(parallel)
+    for actual, expected in zip(serial, parallel):
+        xr.testing.assert_identical(actual, expected)
+
+
+def test_factory_plugin_gets_all_technologies(
+    market_demand, assets, search_space, market, technologies, save_registries
+):
+    from muse.constraints import factory, register_constraints
+
+    received = []
+
+    @register_constraints
+    def all_technologies(demand, assets, search_space, market, technologies, **kwargs):
+        received.append(technologies)
+        return xr.Dataset(dict(b=0, capacity=1))
+
+    factory("all_technologies")(
+        market_demand, assets, search_space, market, technologies
+    )
+    assert received[0] is technologies
+
+
+def test_sum_by_technology(assets):
+    from muse.constraints import _sum_by_technology
+    from muse.utilities import reduce_assets
+
+    capacity = assets.capacity
+    expected = reduce_assets(capacity, coords=["technology"])
+    actual = _sum_by_technology(capacity, coords=["technology"])
+    assert actual.dims == expected.dims
+    assert set(actual.coords) == set(expected.coords)
+    xr.testing.assert_equal(
+        actual.set_index(asset="technology").sortby("asset"),
+        expected.set_index(asset="technology").sortby("asset"),
+    )
+
+
 def test_max_production(max_production):
     dims = {"replacement", "asset", "commodity", "timeslice"}
     assert set(max_production.capacity.dims) == dims
     assert set(max_production.production.dims) == dims
     assert set(max_production.b.dims) == dims
     assert (max_production.capacity <= 0).all()
+    assert max_production.capacity.values.flags.writeable
+    assert max_production.production.values.flags.writeable
+    assert max_production.b.values.flags.writeable
 
 
 def test_demand_limiting_capacity(
@@ -1,15 +1,26 @@
+import shutil
+
+import numpy as np
 import pandas as pd
 import pytest
 from muse import examples
 from muse.wizard import (
+    CsvBatch,
+    CsvEdit,
+    ScenarioPatch,
     add_agent,
     add_new_commodity,
     add_new_process,
     add_price_data_for_new_year,
     add_region,
     add_timeslice,
+    apply_patch,
+    copy_scenario,
+    edit_csv,
     get_sectors,
     modify_toml,
+    read_csv,
+    set_column_constant,
 )
 from tomlkit import dumps, parse
 
@@ -80,6 +91,141 @@ def test_get_sectors(tmp_path):
     assert set(sectors) == {"sector1", "sector2"}
 
 
+def test_copy_scenario(model_path, tmp_path):
+    """Test the copy_scenario function on the default model."""
+    destination = tmp_path / "copy"
+    copy_scenario(model_path, destination, mutable=["technodata/*/Technodata.csv"])
+
+    # All files are present in the copy
+    files = {p.relative_to(model_path) for p in model_path.rglob("*") if p.is_file()}
+    copied = {p.relative_to(destination) for p in destination.rglob("*") if p.is_file()}
+    assert files == copied
+
+    # Mutable files are independent copies of the original
+    technodata = destination / "technodata/power/Technodata.csv"
+    assert not technodata.samefile(model_path / "technodata/power/Technodata.csv")
+
+    # Other files are linked, but writing them leaves the source untouched
+    agents = destination / "technodata/Agents.csv"
+    assert agents.samefile(model_path / "technodata/Agents.csv")
+    original = (model_path / "technodata/Agents.csv").read_text()
+    add_agent(destination, "A2", "A1", "Agent2")
+    df = pd.read_csv(model_path / "technodata/power/Technodata.csv")
+    assert "Agent2" not in df.columns
+    assert (model_path / "technodata/Agents.csv").read_text() == original
+    assert "A2" in pd.read_csv(agents)["Name"].values
+
+    # Copying again resets mutable files and removes files absent from the source
+    (destination / "Results").mkdir()
+    (destination / "Results" / "output.csv").touch()
+    copy_scenario(model_path, destination, mutable=["technodata/*/Technodata.csv"])
+    assert not (destination / "Results").exists()
+    df = pd.read_csv(technodata)
+    assert "Agent2" not in df.columns
+    assert not technodata.samefile(model_path / "technodata/power/Technodata.csv")
+    copied = {p.relative_to(destination) for p in destination.rglob("*") if p.is_file()}
+    assert files == copied
+
+
+def test_read_csv(model_path):
+    """Test the read_csv function on the default model."""
+    path = model_path / "technodata/Agents.csv"
+    pd.testing.assert_frame_equal(
+        read_csv(path, dtype=str), pd.read_csv(path, dtype=str)
+    )
+
+
+def test_set_column_constant(model_path):
+    """Test the set_column_constant function on the default model."""
+    technodata_file = model_path / "technodata/power/Technodata.csv"
+    original = pd.read_csv(technodata_file)
+    set_column_constant(technodata_file, ["cap_par", "fix_par"], 0.5)
+
+    # Check the units row is untouched and the other rows are modified
+    df = pd.read_csv(technodata_file)
+    assert (df.iloc[0] == original.iloc[0]).all()
+    assert (df.loc[1:, ["cap_par", "fix_par"]].astype(float) == 0.5).all(axis=None)
+    other = [c for c in df.columns if c not in ("cap_par", "fix_par")]
+    pd.testing.assert_frame_equal(df[other], original[other])
+
+    # Check the first row is modified if not skipped
+    set_column_constant(technodata_file, "cap_par", 2, skip_first_data_row=False)
+    assert (pd.read_csv(technodata_file)["cap_par"] == 2).all()
+
+
+def test_edit_csv(model_path):
+    """Test the edit_csv function on the default model."""
+    technodata_file = model_path / "technodata/residential/Technodata.csv"
+    original = pd.read_csv(technodata_file)
+    edit_csv(
+        technodata_file,
+        [
+            CsvEdit("cap_par", 1),
+            CsvEdit(
+                ["Fuel", "EndUse"], ["gas", "cook"], where={"ProcessName": "gasboiler"}
+            ),
+            CsvEdit(["cap_par", "fix_par"], 3, where={"ProcessName": "heatpump"}),
+        ],
+    )
+
+    # Check edits are applied in order, to the selected rows only
+    df = pd.read_csv(technodata_file)
+    assert (df.iloc[0] == original.iloc[0]).all()
+    gasboiler = df["ProcessName"] == "gasboiler"
+    heatpump = df["ProcessName"] == "heatpump"
+    assert (df.loc[gasboiler, ["Fuel", "EndUse"]] == ["gas", "cook"]).all(axis=None)
+    assert (df.loc[~gasboiler, "EndUse"] == original.loc[~gasboiler, "EndUse"]).all()
+    assert (df.loc[heatpump, ["cap_par", "fix_par"]].astype(float) == 3).all(axis=None)
+    assert (df.loc[1:, "cap_par"][~heatpump].astype(float) == 1).all()
+
+    # Check the number of values must match the number of columns
+    with pytest.raises(ValueError):
+        edit_csv(technodata_file, [CsvEdit(["cap_par", "fix_par"], [1, 2, 3])])
+
+    # Check arrays give one value per column
+    edit_csv(technodata_file, [CsvEdit(["cap_par", "fix_par"], np.array([5, 6]))])
+    df = pd.read_csv(technodata_file)
+    assert (df.loc[1:, ["cap_par", "fix_par"]].astype(float) == [5, 6]).all(axis=None)
+
+
+def test_apply_patch(model_path, tmp_path):
+    """Test apply_patch gives the same model as the individual functions."""
+    expected = tmp_path / "expected"
+    shutil.copytree(model_path, expected)
+    add_new_commodity(expected, "cook", "residential", "heat")
+    add_new_process(expected, "gas_stove", "residential", "gasboiler")
+    add_agent(expected, agent_name="A2", copy_from="A1", agentshare_new="Agent2")
+    projections = "input/Projections.csv"
+    edit_csv(expected / projections, [CsvEdit("cook", 100)])
+
+    patch = ScenarioPatch()
+    patch.edit_csv(projections, [CsvEdit("cook", 100)])
+    patch.add_agent(agent_name="A2", copy_from="A1", agentshare_new="Agent2")
+    patch.add_new_process("gas_stove", "residential", "gasboiler")
+    patch.add_new_commodity("cook", "residential", "heat")
+    apply_patch(model_path, patch)
+
+    for file in expected.rglob("*.csv"):
+        relative = file.relative_to(expected)
+        assert (model_path / relative).read_text() == file.read_text(), relative
+
+
+def test_csv_batch(model_path):
+    """Test the CsvBatch context manager on the default model."""
+    agents_file = model_path / "technodata/Agents.csv"
+    with CsvBatch(model_path) as batch:
+        df = batch["technodata/Agents.csv"]
+        df["Quantity"] = 0.5
+        assert batch[agents_file] is df
+        batch["input/Projections.csv"] = batch["input/Projections.csv"].iloc[:2]
+
+        # Nothing is written until the context exits
+        assert not (pd.read_csv(agents_file)["Quantity"] == 0.5).all()
+
+    assert (pd.read_csv(agents_file)["Quantity"] == 0.5).all()
+    assert len(pd.read_csv(model_path / "input/Projections.csv")) == 2
+
+
 def test_add_new_commodity(model_path):
     """Test the add_new_commodity function on the default model."""
     add_new_commodity(model_path, "new_commodity", "power", "wind")